@@ -1,9 +1,10 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-from fredapi import Fred
 import requests
+from requests.adapters import HTTPAdapter
+from http.cookiejar import DefaultCookiePolicy
 import plotly.express as px
+from recesion_core import build_indicator_frame, compute_risk, weights
 
 # =========================
 # CONFIGURACIÓN
@@ -14,103 +15,39 @@ st.markdown("<h1 style='text-align:center; color:#1f77b4;'>📊 Recesiómetro IA
 # =========================
 # CLAVES API
 # =========================
-FRED_API_KEY = st.secrets["FRED_API_KEY"]
 GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
 
-fred = Fred(api_key=FRED_API_KEY)
-
-# =========================
-# INDICADORES CLAVE
-# =========================
-key_indicators = {
-    "Real GDP": "GDPC1",
-    "Unemployment": "UNRATE",
-    "CPI": "CPIAUCSL",
-    "Industrial Production": "INDPRO",
-    "Yield Curve (10y-3m)": ["GS10", "TB3MS"],
-    "Consumer Confidence": "UMCSENT"
-}
-
-# =========================
-# DESCARGA DE DATOS
-# =========================
-df = pd.DataFrame()
-
-for name, code in key_indicators.items():
-    try:
-        if isinstance(code, list):
-            df["10Y"] = fred.get_series(code[0])
-            df["3M"] = fred.get_series(code[1])
-            df["Yield Curve (10y-3m)"] = df["10Y"] - df["3M"]
-        else:
-            df[name] = fred.get_series(code)
-    except:
-        st.warning(f"No disponible: {name}")
-
-df = df.asfreq('D').interpolate(method='linear')
-df.sort_index(inplace=True)
-
 # =========================
-# CÁLCULO RIESGO
+# DATOS Y RIESGO
 # =========================
-weights = {
-    "Yield Curve (10y-3m)": 35,
-    "Real GDP": 30,
-    "Unemployment": 30,
-    "CPI": 25,
-    "Industrial Production": 15,
-    "Consumer Confidence": 10
-}
+df, missing = build_indicator_frame()
+for name in missing:
+    st.warning(f"No disponible: {name}")
 
-risk_direction = {
-    "Yield Curve (10y-3m)": False,
-    "Real GDP": False,
-    "Unemployment": True,
-    "CPI": True,
-    "Industrial Production": False,
-    "Consumer Confidence": False
-}
+if not any(var in df.columns for var in weights):
+    st.error("No hay indicadores disponibles para calcular el riesgo de recesión.")
+    st.stop()
 
-df_risk = df.copy()
-df_risk = df_risk.ffill()
-risk = pd.Series(index=df_risk.index, dtype=float)
-pct_change = df_risk.pct_change().fillna(0)
-
-for date in df_risk.index:
-    value = 0
-    for var in weights.keys():
-        if var not in df_risk.columns:
-            continue
-        change = pct_change.loc[date, var]
-        if not risk_direction[var]:
-            change = -change
-        change = np.clip(change, -0.2, 0.2)
-        value += change * weights[var]
-    # Penalización yield curve invertida
-    if "Yield Curve (10y-3m)" in df_risk.columns and df_risk.loc[date, "Yield Curve (10y-3m)"] < 0:
-        value += weights["Yield Curve (10y-3m)"] * 0.5
-    risk[date] = max(0, min(100, value))
-
-df_risk["Risk (%)"] = risk
+df_risk, pct_change = compute_risk(df)
 
 # =========================
 # EVENTOS CLAVE
 # =========================
-df_risk["Delta"] = df_risk["Risk (%)"].diff()
-events = df_risk[df_risk["Delta"] > 5]
+# Saltos de más de 5 puntos respecto al mes anterior
+risk_np = df_risk["Risk (%)"].to_numpy()
+delta = np.diff(risk_np, prepend=risk_np[0])
+event_idx = np.flatnonzero(delta > 5)
 
 # =========================
 # GRAFICA
 # =========================
 fig = px.line(df_risk, y="Risk (%)", title="Riesgo de Recesión (%)")
-for i, row in events.iterrows():
-    # Indicador que más contribuyó al aumento
-    delta_vars = {var: pct_change.loc[i, var] for var in weights.keys() if var in pct_change.columns}
-    top_var = max(delta_vars, key=lambda k: abs(delta_vars[k]))
-    
-    fig.add_annotation(
+# Indicador que más contribuyó a cada aumento
+top_vars = pct_change.iloc[event_idx].abs().idxmax(axis=1)
+annotations = [
+    dict(
         x=i,
-        y=row["Risk (%)"] + 1,
+        y=float(r) + 1,
         text=f"⬆ {top_var} sube",
         showarrow=True,
         arrowhead=2,
@@ -121,38 +58,58 @@ for i, row in events.iterrows():
         bgcolor="red",
         bordercolor="black"
     )
+    for i, r, top_var in zip(top_vars.index, risk_np[event_idx], top_vars.values)
+]
+fig.update_layout(annotations=annotations)
 
 st.plotly_chart(fig, use_container_width=True)
 
 # =========================
 # FUNCION EXPLICACION IA
 # =========================
-def explain_risk_with_llm(risk_value, context_vars):
+@st.cache_resource
+def get_groq_session():
+    # Sesión persistente entre reruns: reutiliza la conexión TLS con Groq.
+    # Se comparte entre sesiones e hilos: solo guarda cabeceras fijas y el pool
+    # de urllib3 (thread-safe); se bloquean las cookies para que no acumule estado
+    session = requests.Session()
+    session.headers.update({"Authorization": f"Bearer {GROQ_API_KEY}"})
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def explain_risk_with_llm(risk_value, context_items):
+    # Cacheada por riesgo y contexto redondeados: los reruns no repiten la llamada
     prompt = f"""
 Eres un analista siguiendo los principios de Ray Dalio.
 Riesgo de recesión actual: {risk_value:.1f}%
-Indicadores recientes: {context_vars}
+Indicadores recientes: {dict(context_items)}
 
 Proporciona una explicación detallada de por qué el riesgo es así, en qué se basa y cuál es el porcentaje actual de riesgo de recesión.
 Responde en texto plano.
 """
-    headers = {"Authorization": f"Bearer {GROQ_API_KEY}"}
     payload = {
         "prompt": prompt,
         "model": "llama3-70b",
         "max_output_tokens": 300,
         "temperature": 0.7
     }
-    try:
-        response = requests.post("https://api.groq.com/v1/generate", headers=headers, json=payload)
-        return response.json().get("completion", response.text)
-    except Exception as e:
-        return f"⚠️ AI error: {e}"
+    # Los errores se propagan para que no queden en caché
+    response = get_groq_session().post("https://api.groq.com/v1/generate", json=payload, timeout=30)
+    response.raise_for_status()
+    return response.json().get("completion", response.text)
 
 latest_risk = df_risk["Risk (%)"].iloc[-1]
-context_vars = df_risk.tail(1).to_dict(orient="records")[0]
+context_vars = df_risk.iloc[-1].to_dict()
 
-explanation = explain_risk_with_llm(latest_risk, context_vars)
+try:
+    explanation = explain_risk_with_llm(
+        round(float(latest_risk), 1),
+        tuple(sorted((var, round(float(value), 2)) for var, value in context_vars.items()))
+    )
+except Exception as e:
+    explanation = f"⚠️ AI error: {e}"
 
 st.markdown("### 🤖 Evaluación de Riesgo (IA)")
 st.write(explanation)
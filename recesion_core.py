@@ -0,0 +1,119 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from fredapi import Fred
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# =========================
+# INDICADORES CLAVE
+# =========================
+key_indicators = {
+    "Real GDP": "GDPC1",
+    "Unemployment": "UNRATE",
+    "CPI": "CPIAUCSL",
+    "Industrial Production": "INDPRO",
+    "Yield Curve (10y-3m)": ["GS10", "TB3MS"],
+    "Consumer Confidence": "UMCSENT"
+}
+
+weights = {
+    "Yield Curve (10y-3m)": 35,
+    "Real GDP": 30,
+    "Unemployment": 30,
+    "CPI": 25,
+    "Industrial Production": 15,
+    "Consumer Confidence": 10
+}
+
+risk_direction = {
+    "Yield Curve (10y-3m)": False,
+    "Real GDP": False,
+    "Unemployment": True,
+    "CPI": True,
+    "Industrial Production": False,
+    "Consumer Confidence": False
+}
+
+# =========================
+# DESCARGA DE DATOS
+# =========================
+@st.cache_resource
+def get_fred():
+    # Un único cliente FRED por proceso, compartido entre sesiones y reruns
+    return Fred(api_key=st.secrets["FRED_API_KEY"])
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_series(code):
+    serie = get_fred().get_series(code)
+    serie.index = pd.to_datetime(serie.index)
+    return serie
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _build_indicator_frame():
+    # Descarga concurrente: las peticiones a FRED son independientes
+    series_codes = [c for code in key_indicators.values() for c in (code if isinstance(code, list) else [code])]
+    # Los hilos heredan el contexto del script para usar las cachés de Streamlit
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=len(series_codes), initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        downloads = {c: executor.submit(fetch_series, c) for c in series_codes}
+
+    cols = {}
+    missing = []
+
+    for name, code in key_indicators.items():
+        try:
+            if isinstance(code, list):
+                cols["10Y"] = downloads[code[0]].result()
+                cols["3M"] = downloads[code[1]].result()
+                cols["Yield Curve (10y-3m)"] = cols["10Y"] - cols["3M"]
+            else:
+                cols[name] = downloads[code].result()
+        except Exception:
+            missing.append(name)
+
+    if not cols:
+        # Ninguna descarga disponible: frame vacío y todos los indicadores como no disponibles
+        return pd.DataFrame(dtype=np.float32), missing
+
+    # float32 basta para series macro y reduce a la mitad la memoria
+    df = pd.concat(cols, axis=1).astype(np.float32)
+
+    # Frecuencia mensual: la cadencia más gruesa común a los indicadores
+    df = df.sort_index().resample('MS').last().ffill()
+    return df, missing
+
+def build_indicator_frame():
+    # Devuelve el frame mensual de indicadores y la lista de los no disponibles
+    df, missing = _build_indicator_frame()
+    if missing:
+        # No dejar en caché un frame incompleto: se reintenta en el próximo rerun
+        _build_indicator_frame.clear()
+    return df, missing
+
+# =========================
+# CÁLCULO RIESGO
+# =========================
+def compute_risk(df):
+    # Devuelve una copia de df con "Risk (%)" y los cambios porcentuales usados
+    # Solo las variables ponderadas intervienen en el riesgo
+    col_set = set(df.columns)
+    vars_present = [var for var in weights if var in col_set]
+    pct_change = df[vars_present].pct_change().fillna(0)
+
+    # Pesos con signo: positivo si la variable sube el riesgo, negativo si lo baja
+    signed_weights = np.array(
+        [weights[var] if risk_direction[var] else -weights[var] for var in vars_present],
+        dtype=np.float32
+    )
+
+    changes = np.clip(pct_change.to_numpy(), -0.2, 0.2)
+    risk = changes @ signed_weights
+
+    # Penalización yield curve invertida
+    if "Yield Curve (10y-3m)" in col_set:
+        inverted = df["Yield Curve (10y-3m)"].to_numpy() < 0
+        np.add(risk, weights["Yield Curve (10y-3m)"] * 0.5, out=risk, where=inverted)
+
+    np.clip(risk, 0, 100, out=risk)
+    return df.assign(**{"Risk (%)": risk}), pct_change